@@ -1,175 +1,22 @@
-# from fastmcp import FastMCP
-# import os
-# import aiosqlite
-# import sqlite3
-# import logging
-# import tempfile
-# from datetime import datetime
-# from typing import List, Dict, Any, Optional
-
-# # --- Configuration & Logging ---
-# logging.basicConfig(level=logging.INFO)
-# logger = logging.getLogger("MathMasterPro")
-
-# # PRODUCTION FIX: Use a writable temporary directory for the database.
-# # This prevents 'unable to open database file' errors on read-only cloud filesystems.
-# TEMP_DIR = tempfile.gettempdir()
-# DB_PATH = os.environ.get("DATABASE_PATH", os.path.join(TEMP_DIR, "math_tuition_prod.db"))
-
-# # Initialize FastMCP Server object
-# mcp = FastMCP("MathMaster_Pro")
-
-# # --- Database Schema Setup ---
-# def init_db() -> None:
-#     """Initializes the SQLite schema with WAL mode and foreign key support."""
-#     try:
-#         # Use standard sqlite3 for initial sync setup
-#         with sqlite3.connect(DB_PATH) as conn:
-#             conn.execute("PRAGMA journal_mode=WAL")
-#             conn.execute("PRAGMA foreign_keys = ON")
-#             cursor = conn.cursor()
-            
-#             # Students Registry
-#             cursor.execute("""
-#                 CREATE TABLE IF NOT EXISTS students(
-#                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-#                     name TEXT NOT NULL,
-#                     grade TEXT NOT NULL,
-#                     monthly_fee REAL DEFAULT 0.0,
-#                     joined_date DATE DEFAULT CURRENT_DATE
-#                 )
-#             """)
-            
-#             # Academic Progress Tracking
-#             cursor.execute("""
-#                 CREATE TABLE IF NOT EXISTS test_results(
-#                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-#                     student_id INTEGER,
-#                     test_date DATE NOT NULL,
-#                     topic TEXT NOT NULL,
-#                     marks_obtained REAL NOT NULL,
-#                     total_marks REAL NOT NULL,
-#                     FOREIGN KEY(student_id) REFERENCES students(id) ON DELETE CASCADE
-#                 )
-#             """)
-#             conn.commit()
-#             logger.info(f"✅ Database initialized at: {DB_PATH}")
-#     except Exception as e:
-#         logger.error(f"❌ DB Init Failed: {e}")
-#         raise
-
-# # Ensure DB is ready on startup
-# init_db()
-
-# # --- MCP Tools (Strictly Formatted for Azure Foundry Schema) ---
-
-# @mcp.tool()
-# async def add_student(name: str, grade: str, monthly_fee: float) -> Dict[str, Any]:
-#     """
-#     Registers a new student into the tutoring system.
-    
-#     Args:
-#         name: The full legal name of the student.
-#         grade: The current grade or class level (e.g., 'Grade 10').
-#         monthly_fee: The agreed upon monthly tuition fee amount.
-#     """
-#     try:
-#         async with aiosqlite.connect(DB_PATH) as db:
-#             cursor = await db.execute(
-#                 "INSERT INTO students (name, grade, monthly_fee) VALUES (?, ?, ?)",
-#                 (name, grade, monthly_fee)
-#             )
-#             await db.commit()
-#             return {"status": "success", "student_id": cursor.lastrowid}
-#     except Exception as e:
-#         return {"status": "error", "message": str(e)}
-
-# @mcp.tool()
-# async def record_test_score(
-#     student_id: int, 
-#     topic: str, 
-#     marks: float, 
-#     total: float, 
-#     date: Optional[str] = None
-# ) -> Dict[str, Any]:
-#     """
-#     Logs test marks for a student to track academic performance.
-    
-#     Args:
-#         student_id: The unique ID of the student.
-#         topic: The specific subject or topic tested (e.g., 'Trigonometry').
-#         marks: The score obtained by the student.
-#         total: The maximum possible score.
-#         date: The date of the test (YYYY-MM-DD). Defaults to today.
-#     """
-#     test_date: str = date if date else datetime.now().strftime("%Y-%m-%d")
-#     try:
-#         async with aiosqlite.connect(DB_PATH) as db:
-#             await db.execute(
-#                 "INSERT INTO test_results (student_id, test_date, topic, marks_obtained, total_marks) VALUES (?, ?, ?, ?, ?)",
-#                 (student_id, test_date, topic, marks, total)
-#             )
-#             await db.commit()
-#             return {"status": "success", "message": f"Recorded score for {topic}."}
-#     except Exception as e:
-#         return {"status": "error", "message": str(e)}
-
-# @mcp.tool()
-# async def get_student_report(student_id: int) -> Dict[str, Any]:
-#     """
-#     Retrieves full profile and academic history for a student.
-    
-#     Args:
-#         student_id: The unique integer ID of the student.
-#     """
-#     try:
-#         async with aiosqlite.connect(DB_PATH) as db:
-#             db.row_factory = aiosqlite.Row
-#             async with db.execute("SELECT * FROM students WHERE id = ?", (student_id,)) as cur:
-#                 profile = await cur.fetchone()
-#                 if not profile: return {"status": "error", "message": "Student not found"}
-                
-#             async with db.execute("SELECT * FROM test_results WHERE student_id = ? ORDER BY test_date DESC", (student_id,)) as cur:
-#                 tests: List[Dict[str, Any]] = [dict(row) for row in await cur.fetchall()]
-
-#             return {"profile": dict(profile), "academic_history": tests}
-#     except Exception as e:
-#         return {"status": "error", "message": str(e)}
-
-# @mcp.tool()
-# async def delete_student(student_id: int) -> Dict[str, str]:
-#     """
-#     Permanently deletes a student and all their academic records.
-    
-#     Args:
-#         student_id: The unique integer ID of the student to delete.
-#     """
-#     try:
-#         async with aiosqlite.connect(DB_PATH) as db:
-#             await db.execute("DELETE FROM students WHERE id = ?", (student_id,))
-#             await db.commit()
-#             return {"status": "success", "message": f"Student ID {student_id} deleted."}
-#     except Exception as e:
-#         return {"status": "error", "message": str(e)}
-
-# # --- Entry Point ---
-# # Cloud platforms like Horizon ignore the __main__ block for discovery.
-# # The 'mcp' object at the top level is used for the SSE server.
-# if __name__ == "__main__":
-#     mcp.run(transport="sse", host="0.0.0.0", port=8000)
-
-
-
-
-
 from fastmcp import FastMCP
 import os
+import re
+import datetime
+import functools
+import asyncio
 import aiosqlite
+import anyio
+import orjson
 import sqlite3
 import logging
 import tempfile
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, closing
+from pathlib import Path
+from typing import List, Dict, Any, AsyncIterator, Awaitable, Callable, NotRequired, Optional, Set, Tuple, TypedDict, TypeVar
+
+T = TypeVar("T")
 
 # --- Configuration & Logging ---
 logging.basicConfig(level=logging.INFO)
@@ -177,43 +24,511 @@ logger = logging.getLogger("MathMasterPro")
 
 # CLOUD DEPLOYMENT FIX: Use /tmp for a writable database file.
 # This prevents the 'unable to open database' error on Horizon.
-TEMP_DIR = tempfile.gettempdir()
-DB_PATH = os.environ.get("DATABASE_PATH", os.path.join(TEMP_DIR, "math_tuition_prod.db"))
+TEMP_DIR = Path(tempfile.gettempdir())
+DB_PATH = os.environ.get("DATABASE_PATH") or str(TEMP_DIR / "math_tuition_prod.db")
+
+# Read-only connections next to the single writer: MIN are opened up front,
+# more are added on demand up to MAX when every reader is checked out.
+READER_POOL_MIN = int(os.environ.get("DB_READER_POOL_MIN", "2"))
+READER_POOL_MAX = int(os.environ.get("DB_READER_POOL_MAX", "10"))
+
+# Write tuning: WAL + synchronous=NORMAL avoids an fsync per COMMIT, and a 64 MB
+# page cache / 256 MB mmap keeps hot pages in memory. These are per-connection
+# (unlike journal_mode), so every connection we open applies them. Checkpointing
+# is not set here: only the writer commits, and it leaves that to _checkpoint_loop.
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-65536",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Insertion buffer: single-row inserts are grouped for up to this many rows or
+# this many milliseconds and committed together (0 ms flushes whatever is queued).
+INSERT_BATCH_MAX = int(os.environ.get("DB_INSERT_BATCH_MAX", "500"))
+INSERT_FLUSH_MS = float(os.environ.get("DB_INSERT_FLUSH_MS", "50"))
+
+# The writer checkpoints the WAL from a background task at this interval instead
+# of letting an unlucky COMMIT run the auto-checkpoint inline.
+CHECKPOINT_INTERVAL_S = float(os.environ.get("DB_CHECKPOINT_INTERVAL_S", "5"))
+# Once a checkpoint has copied the whole WAL back, the next write restarts the
+# log and truncates the file to this size, so a burst cannot leave a huge WAL behind.
+WAL_SIZE_LIMIT_BYTES = int(os.environ.get("DB_WAL_SIZE_LIMIT_BYTES", str(64 * 1024 * 1024)))
+
+# Rows pulled from a reader's worker thread per hop when iterating a cursor
+# (aiosqlite's default of 64 costs a thread round-trip every 64 rows).
+READ_CHUNK_SIZE = 1000
+
+# Prepared statements kept per connection by sqlite3, keyed by SQL text, so
+# repeated tool calls skip SQLite's parse/plan step (the default is 128).
+STATEMENT_CACHE_SIZE = 256
+
+# Most recently used student reports kept in memory between writes.
+REPORT_CACHE_MAX = int(os.environ.get("REPORT_CACHE_MAX", "1024"))
+
+# --- Connection Pool ---
+def _wal_checkpoint(conn: sqlite3.Connection, mode: str) -> None:
+    """ Runs a WAL checkpoint in the given mode (PASSIVE, TRUNCATE, ...). """
+    conn.execute(f"PRAGMA wal_checkpoint({mode})")
+
+class AioSqlitePool:
+    """
+    One writer connection on a dedicated thread plus a queue of read-only connections.
+
+    In WAL mode readers never block the writer (and vice versa), so read tools
+    check out an aiosqlite reader. Writes run as plain synchronous functions on
+    the writer thread: a whole transaction costs one hop off the event loop, and
+    a slow COMMIT or checkpoint never stalls it.
+    """
+
+    def __init__(self, path: str, min_readers: int, max_readers: int) -> None:
+        self._path = path
+        self._min_readers = max(1, min_readers)
+        self._max_readers = max(self._min_readers, max_readers)
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writer_pool: Optional[ThreadPoolExecutor] = None
+        self._readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._all_readers: List[aiosqlite.Connection] = []
+        self._reader_slots = 0
+        self._open_lock = asyncio.Lock()
+        self._checkpointer: Optional[asyncio.Task] = None
+
+    def _open_writer(self) -> None:
+        # Runs on the writer thread, which then owns the connection.
+        conn = sqlite3.connect(self._path, cached_statements=STATEMENT_CACHE_SIZE)
+        conn.execute("PRAGMA journal_mode=WAL")
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        conn.execute("PRAGMA foreign_keys=ON")
+        # Checkpoints run from _checkpoint_loop so no COMMIT pays for one.
+        conn.execute("PRAGMA wal_autocheckpoint=0")
+        conn.execute(f"PRAGMA journal_size_limit={WAL_SIZE_LIMIT_BYTES}")
+        self._writer = conn
+
+    async def _ensure_open(self) -> None:
+        if self._writer is not None:
+            return
+        async with self._open_lock:
+            if self._writer is not None:
+                return
+            self._writer_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+            await asyncio.get_running_loop().run_in_executor(self._writer_pool, self._open_writer)
+
+            for _ in range(self._min_readers):
+                self._readers.put_nowait(await self._open_reader())
+
+            self._checkpointer = asyncio.create_task(self._checkpoint_loop())
+            logger.info(f"🔌 Connection pool opened (1 writer, {self._min_readers}-{self._max_readers} readers)")
+
+    async def _open_reader(self) -> aiosqlite.Connection:
+        # mode=ro makes the file read-only for this handle; query_only also rejects
+        # writes to temp objects, so a reader can never take the write lock.
+        # Claim the slot before awaiting so concurrent callers cannot overshoot the maximum.
+        self._reader_slots += 1
+        try:
+            ro_uri = f"{Path(self._path).absolute().as_uri()}?mode=ro"
+            reader = await aiosqlite.connect(
+                ro_uri, uri=True, iter_chunk_size=READ_CHUNK_SIZE, cached_statements=STATEMENT_CACHE_SIZE
+            )
+            for pragma in CONNECTION_PRAGMAS:
+                await reader.execute(pragma)
+            await reader.execute("PRAGMA query_only=ON")
+        except BaseException:
+            self._reader_slots -= 1
+            raise
+        self._all_readers.append(reader)
+        return reader
+
+    async def _checkpoint_loop(self) -> None:
+        # PASSIVE never waits on readers, so it only copies frames nobody still needs
+        # and never stalls the writer thread; journal_size_limit bounds the file size.
+        while True:
+            await asyncio.sleep(CHECKPOINT_INTERVAL_S)
+            try:
+                await self.write(_wal_checkpoint, "PASSIVE")
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ WAL checkpoint failed: {e}")
 
-mcp = FastMCP("MathMaster_Pro")
+    async def open(self) -> None:
+        """ Opens the writer and reader connections now rather than on first use. """
+        await self._ensure_open()
+
+    @asynccontextmanager
+    async def acquire_reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """ Checks out a read-only connection for the duration of the block. """
+        await self._ensure_open()
+        if self._readers.empty() and self._reader_slots < self._max_readers:
+            db = await self._open_reader()
+        else:
+            db = await self._readers.get()
+        try:
+            yield db
+        finally:
+            self._readers.put_nowait(db)
+
+    def _call_writer(self, fn: Callable[..., T], args: tuple) -> T:
+        try:
+            return fn(self._writer, *args)
+        except BaseException:
+            self._writer.rollback()
+            raise
+
+    async def write(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Runs fn(conn, *args) on the writer thread and returns its result.
+
+        The single-thread executor serializes writers; anything fn leaves
+        uncommitted is rolled back if it raises.
+        """
+        await self._ensure_open()
+        return await asyncio.get_running_loop().run_in_executor(
+            self._writer_pool, self._call_writer, fn, args
+        )
+
+    async def close(self) -> None:
+        """ Closes every reader, truncates the WAL and closes the writer, then stops the writer thread. """
+        if self._writer is None:
+            return
+        # Teardown often runs in an already-cancelled scope (e.g. a client leaving
+        # its context). Shield it: a close cut short leaves non-daemon threads behind
+        # and the interpreter never exits.
+        with anyio.CancelScope(shield=True):
+            loop = asyncio.get_running_loop()
+            try:
+                if self._checkpointer is not None:
+                    self._checkpointer.cancel()
+                    try:
+                        await self._checkpointer
+                    except asyncio.CancelledError:
+                        pass
+                    self._checkpointer = None
+                for reader in self._all_readers:
+                    try:
+                        await reader.close()
+                    except Exception as e:
+                        logger.warning(f"⚠️ Reader close failed: {e}")
+                try:
+                    await loop.run_in_executor(self._writer_pool, _wal_checkpoint, self._writer, "TRUNCATE")
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ WAL checkpoint failed: {e}")
+                await loop.run_in_executor(self._writer_pool, self._writer.close)
+            finally:
+                self._all_readers.clear()
+                self._reader_slots = 0
+                self._readers = asyncio.Queue()
+                self._writer_pool.shutdown(wait=True)
+                self._writer = None
+                self._writer_pool = None
+                logger.info("🔌 Connection pool closed")
+
+db_pool = AioSqlitePool(DB_PATH, READER_POOL_MIN, READER_POOL_MAX)
+
+# --- Insertion Buffer ---
+class InsertBuffer:
+    """
+    Coalesces high-frequency single-row inserts into one transaction.
+
+    Callers queue (sql, params) and wait until the batch holding their row is
+    committed, so N concurrent inserts cost one COMMIT instead of N.
+    """
+
+    def __init__(self, pool: AioSqlitePool, max_batch: int, flush_ms: float) -> None:
+        self._pool = pool
+        self._max_batch = max(1, max_batch)
+        self._linger = max(0.0, flush_ms) / 1000
+        self._queue: asyncio.Queue[Tuple[Optional[str], tuple, asyncio.Future]] = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            if self._task is not None:
+                if not self._task.cancelled() and self._task.exception() is not None:
+                    logger.error(f"❌ Insert flusher failed: {self._task.exception()}")
+                # The dead flusher already failed what was queued, and its queue
+                # may be bound to an event loop that no longer runs.
+                self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    async def insert(self, sql: str, params: tuple) -> None:
+        """ Queues one row and returns once it has been committed (or raises its error). """
+        self._ensure_running()
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((sql, params, fut))
+        await fut
+
+    async def flush_now(self) -> None:
+        """ Commits everything queued so far without waiting out the linger window. """
+        if self._task is None or self._task.done():
+            return
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((None, (), fut))
+        await fut
+
+    async def close(self) -> None:
+        """ Flushes pending rows and stops the background flusher. """
+        # Shielded like the pool's close: teardown often runs in a cancelled scope.
+        with anyio.CancelScope(shield=True):
+            await self.flush_now()
+            if self._task is not None:
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+                except Exception as e:
+                    # A flusher that already died re-raises its own error here; shutdown must still go on.
+                    logger.error(f"❌ Insert flusher failed: {e}")
+                self._task = None
+            # Queues bind to the loop that first waits on them; the next run gets a fresh one.
+            self._queue = asyncio.Queue()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        batch: List[Tuple[Optional[str], tuple, asyncio.Future]] = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self._linger
+                while batch[-1][0] is not None and len(batch) < self._max_batch:
+                    if not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                        continue
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except TimeoutError:
+                        break
+                await self._flush(batch)
+        finally:
+            # However the flusher stops (cancelled by close() or crashed), nobody may
+            # be left waiting: fail the batch in hand and everything still queued.
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            stopped = RuntimeError("Insert buffer stopped; the row may not have been committed.")
+            for sql, _, fut in batch:
+                if fut.done():
+                    continue
+                if sql is None:
+                    fut.set_result(None)
+                else:
+                    fut.set_exception(stopped)
+
+    async def _flush(self, batch: List[Tuple[Optional[str], tuple, asyncio.Future]]) -> None:
+        rows = [(sql, params) for sql, params, _ in batch if sql is not None]
+        try:
+            errors = await self._pool.write(_commit_rows, rows) if rows else []
+        except Exception as e:
+            # Anything _commit_rows could not attribute to a single row fails the
+            # whole batch; the flusher itself must survive to serve later inserts.
+            errors = [e] * len(rows)
+
+        pending = (fut for sql, _, fut in batch if sql is not None)
+        for fut, error in zip(pending, errors):
+            if fut.done():
+                continue
+            if error is None:
+                fut.set_result(None)
+            else:
+                fut.set_exception(error)
+        for sql, _, fut in batch:
+            if sql is None and not fut.done():
+                fut.set_result(None)
+
+def _commit_rows(conn: sqlite3.Connection, rows: List[Tuple[str, tuple]]) -> List[Optional[Exception]]:
+    """ Commits queued rows in one transaction and returns each row's error (None when stored). """
+    groups: Dict[str, List[tuple]] = {}
+    for sql, params in rows:
+        groups.setdefault(sql, []).append(params)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        for sql, group in groups.items():
+            conn.executemany(sql, group)
+        conn.commit()
+        return [None] * len(rows)
+    # OverflowError comes from binding an integer too large for SQLite.
+    except (sqlite3.Error, OverflowError):
+        conn.rollback()
+
+    # One bad row fails the whole batch; replay row by row so every caller
+    # gets its own outcome.
+    errors: List[Optional[Exception]] = []
+    for sql, params in rows:
+        try:
+            conn.execute(sql, params)
+            conn.commit()
+            errors.append(None)
+        except (sqlite3.Error, OverflowError) as e:
+            conn.rollback()
+            errors.append(e)
+    return errors
+
+insert_buffer = InsertBuffer(db_pool, INSERT_BATCH_MAX, INSERT_FLUSH_MS)
+
+@asynccontextmanager
+async def lifespan(server: FastMCP) -> AsyncIterator[None]:
+    """ Opens the connection pool at startup; flushes buffered inserts and releases it on shutdown. """
+    # Opening here keeps connection setup off the first tool call.
+    await db_pool.open()
+    try:
+        yield
+    finally:
+        try:
+            await insert_buffer.close()
+        finally:
+            await db_pool.close()
+
+def dump_tool_result(result: Any) -> str:
+    """ Serializes tool results with orjson, which is much faster than the default on row-heavy payloads. """
+    return orjson.dumps(result).decode()
+
+mcp = FastMCP("MathMaster_Pro", lifespan=lifespan, tool_serializer=dump_tool_result)
 
 # --- Database Schema Setup ---
+# Bump whenever the schema changes, adding the upgrade step to MIGRATIONS.
+CURRENT_SCHEMA_VERSION = 5
+
+# Dates are stored as INTEGER YYYYMMDD: a 4-byte varint instead of a 10-byte
+# string per row, integer comparisons for range scans and smaller index pages.
+# Ids are plain rowid aliases: AUTOINCREMENT would add a sqlite_sequence
+# read and update to every insert only to stop deleted ids being reused.
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS students(
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    grade TEXT NOT NULL,
+    monthly_fee REAL DEFAULT 0.0,
+    joined_date INTEGER NOT NULL DEFAULT (CAST(strftime('%Y%m%d', 'now') AS INTEGER))
+        CHECK(joined_date >= 19000101)
+);
+
+CREATE TABLE IF NOT EXISTS test_results(
+    id INTEGER PRIMARY KEY,
+    student_id INTEGER,
+    test_date INTEGER NOT NULL CHECK(test_date >= 19000101),
+    topic TEXT NOT NULL,
+    marks_obtained REAL NOT NULL,
+    total_marks REAL NOT NULL,
+    FOREIGN KEY(student_id) REFERENCES students(id) ON DELETE CASCADE
+);
+
+-- SQLite does not index referencing columns; without this every report lookup
+-- and every cascaded delete scans the whole table. Including test_date lets the
+-- report read a student's tests already in ORDER BY order, with no sort step.
+CREATE INDEX IF NOT EXISTS idx_tests_student_date ON test_results(student_id, test_date DESC);
+"""
+
+# Upgrade scripts for databases created by an older schema, keyed by the
+# version they bring the database to. Unversioned databases count as v1.
+# init_db runs each one in its own transaction together with the user_version
+# bump, so a step is either fully applied and recorded or not applied at all.
+MIGRATIONS = {
+    2: """
+CREATE INDEX IF NOT EXISTS idx_test_results_student ON test_results(student_id);
+""",
+    # TEXT 'YYYY-MM-DD' dates -> INTEGER YYYYMMDD. Changing a column type needs a
+    # table rebuild; unparseable legacy dates fall back to 19000101. Values that
+    # are already INTEGER are kept: strftime() would read them as Julian days.
+    3: """
+CREATE TABLE students_new(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    grade TEXT NOT NULL,
+    monthly_fee REAL DEFAULT 0.0,
+    joined_date INTEGER NOT NULL DEFAULT (CAST(strftime('%Y%m%d', 'now') AS INTEGER))
+        CHECK(joined_date >= 19000101)
+);
+INSERT INTO students_new (id, name, grade, monthly_fee, joined_date)
+    SELECT id, name, grade, monthly_fee,
+           CASE WHEN typeof(joined_date) = 'integer' THEN joined_date
+                ELSE COALESCE(CAST(strftime('%Y%m%d', joined_date) AS INTEGER), 19000101) END
+    FROM students;
+DROP TABLE students;
+ALTER TABLE students_new RENAME TO students;
+
+CREATE TABLE test_results_new(
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER,
+    test_date INTEGER NOT NULL CHECK(test_date >= 19000101),
+    topic TEXT NOT NULL,
+    marks_obtained REAL NOT NULL,
+    total_marks REAL NOT NULL,
+    FOREIGN KEY(student_id) REFERENCES students(id) ON DELETE CASCADE
+);
+INSERT INTO test_results_new (id, student_id, test_date, topic, marks_obtained, total_marks)
+    SELECT id, student_id,
+           CASE WHEN typeof(test_date) = 'integer' THEN test_date
+                ELSE COALESCE(CAST(strftime('%Y%m%d', test_date) AS INTEGER), 19000101) END,
+           topic, marks_obtained, total_marks
+    FROM test_results;
+DROP TABLE test_results;
+ALTER TABLE test_results_new RENAME TO test_results;
+CREATE INDEX IF NOT EXISTS idx_test_results_student ON test_results(student_id);
+""",
+    4: """
+DROP INDEX IF EXISTS idx_test_results_student;
+CREATE INDEX IF NOT EXISTS idx_tests_student_date ON test_results(student_id, test_date DESC);
+""",
+    # Drop AUTOINCREMENT from both ids; like any column change this needs a rebuild.
+    5: """
+CREATE TABLE students_new(
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    grade TEXT NOT NULL,
+    monthly_fee REAL DEFAULT 0.0,
+    joined_date INTEGER NOT NULL DEFAULT (CAST(strftime('%Y%m%d', 'now') AS INTEGER))
+        CHECK(joined_date >= 19000101)
+);
+INSERT INTO students_new SELECT id, name, grade, monthly_fee, joined_date FROM students;
+DROP TABLE students;
+ALTER TABLE students_new RENAME TO students;
+
+CREATE TABLE test_results_new(
+    id INTEGER PRIMARY KEY,
+    student_id INTEGER,
+    test_date INTEGER NOT NULL CHECK(test_date >= 19000101),
+    topic TEXT NOT NULL,
+    marks_obtained REAL NOT NULL,
+    total_marks REAL NOT NULL,
+    FOREIGN KEY(student_id) REFERENCES students(id) ON DELETE CASCADE
+);
+INSERT INTO test_results_new
+    SELECT id, student_id, test_date, topic, marks_obtained, total_marks FROM test_results;
+DROP TABLE test_results;
+ALTER TABLE test_results_new RENAME TO test_results;
+CREATE INDEX IF NOT EXISTS idx_tests_student_date ON test_results(student_id, test_date DESC);
+""",
+}
+
+def _apply_schema_step(conn: sqlite3.Connection, script: str, version: int) -> None:
+    """ Runs one schema script and records its version atomically. """
+    # IMMEDIATE takes the write lock before any DDL; user_version lives in the
+    # database header, so setting it before COMMIT makes it part of the step.
+    conn.executescript(f"BEGIN IMMEDIATE;\n{script}\nPRAGMA user_version={version};\nCOMMIT;")
+
 def init_db():
-    """ Initializes the SQLite schema using standard synchronous sqlite3. """
+    """ Creates or upgrades the SQLite schema, skipping the DDL entirely once user_version is current. """
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            conn.execute("PRAGMA journal_mode=WAL")
-            conn.execute("PRAGMA foreign_keys = ON")
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS students(
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    grade TEXT NOT NULL,
-                    monthly_fee REAL DEFAULT 0.0,
-                    joined_date DATE DEFAULT CURRENT_DATE
-                )
-            """)
-            
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS test_results(
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    student_id INTEGER,
-                    test_date DATE NOT NULL,
-                    topic TEXT NOT NULL,
-                    marks_obtained REAL NOT NULL,
-                    total_marks REAL NOT NULL,
-                    FOREIGN KEY(student_id) REFERENCES students(id) ON DELETE CASCADE
-                )
-            """)
-            conn.commit()
-            logger.info(f"✅ Database ready at: {DB_PATH}")
+        # Autocommit and an explicit close: `with sqlite3.connect()` alone only commits
+        # (forcing a write on every start) and leaves the connection open.
+        with closing(sqlite3.connect(DB_PATH, isolation_level=None)) as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < CURRENT_SCHEMA_VERSION:
+                for pragma in CONNECTION_PRAGMAS:
+                    conn.execute(pragma)
+                has_schema = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'students'"
+                ).fetchone()
+                # Journal mode cannot change inside a transaction, so set it before any step.
+                conn.execute("PRAGMA journal_mode=WAL")
+                if has_schema:
+                    for target in range(max(version, 1) + 1, CURRENT_SCHEMA_VERSION + 1):
+                        _apply_schema_step(conn, MIGRATIONS[target], target)
+                else:
+                    _apply_schema_step(conn, SCHEMA_SQL, CURRENT_SCHEMA_VERSION)
+                logger.info(f"🛠️ Schema upgraded from v{version} to v{CURRENT_SCHEMA_VERSION}")
+        logger.info(f"✅ Database ready at: {DB_PATH}")
     except Exception as e:
         logger.error(f"❌ DB Init Failed: {e}")
         raise
@@ -221,9 +536,144 @@ def init_db():
 # Ensure DB is ready on startup
 init_db()
 
+# --- Helpers ---
+
+# Earliest date the schema's CHECK constraints accept.
+MIN_DATE_INT = 19000101
+ISO_DATE_RE = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+
+def date_to_int(value: str) -> int:
+    """ Validates an ISO date string and converts it to the stored YYYYMMDD integer. """
+    # date.fromisoformat also accepts forms such as '20240115' and '2024-W03-1'
+    # since 3.11, and strptime accepts unpadded '2024-1-5': check the shape first.
+    try:
+        if not ISO_DATE_RE.fullmatch(value):
+            raise ValueError
+        d = datetime.datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid date {value!r}, expected YYYY-MM-DD.") from None
+    result = d.year * 10000 + d.month * 100 + d.day
+    if result < MIN_DATE_INT:
+        raise ValueError(f"Invalid date {value!r}, must be on or after 1900-01-01.")
+    return result
+
+def int_to_iso(value: int) -> str:
+    """ Formats a stored YYYYMMDD integer back into YYYY-MM-DD for clients. """
+    return f"{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}"
+
+def tool_errors(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """ Turns expected tool failures into {"status": "error"} results so tool bodies need no try block. """
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        try:
+            return await fn(*args, **kwargs)
+        except KeyError as e:
+            return {"status": "error", "message": f"Missing field {e}."}
+        except (sqlite3.Error, ValueError, OverflowError) as e:
+            return {"status": "error", "message": str(e)}
+    return wrapper
+
+# --- Report Cache ---
+
+# student_id -> (student version the report was built at, report), in LRU order.
+_report_cache: "OrderedDict[int, Tuple[int, Dict[str, Any]]]" = OrderedDict()
+# Bumped after every committed write touching a student, so a report built
+# while a write was in flight is never served once that write lands. Only
+# written ids get an entry (reads use .get), and deletes remove theirs.
+_student_version: Dict[int, int] = defaultdict(int)
+# Bumped by every delete. Dropping a deleted id's version resets it to 0, so a
+# report read while that delete was in flight is caught by this counter instead.
+_delete_epoch = 0
+
+def invalidate_students(*student_ids: int) -> None:
+    """ Marks cached reports for these students as stale. """
+    for student_id in student_ids:
+        _student_version[student_id] += 1
+        _report_cache.pop(student_id, None)
+
+def forget_student(student_id: int) -> None:
+    """ Drops all cached state for a deleted student. """
+    global _delete_epoch
+    _delete_epoch += 1
+    _student_version.pop(student_id, None)
+    _report_cache.pop(student_id, None)
+
+# Strong references to shielded writes whose caller has gone away.
+_shielded_writes: Set["asyncio.Task[Any]"] = set()
+
+async def run_shielded(coro: Awaitable[T]) -> T:
+    """
+    Runs a write and its cache invalidation to completion even if the caller is cancelled.
+
+    Cancelling a tool call does not stop the writer thread or the insert buffer from
+    committing, so the invalidation that follows the commit must not be skipped either.
+    """
+    task = asyncio.ensure_future(coro)
+    _shielded_writes.add(task)
+    task.add_done_callback(_shielded_writes.discard)
+    # Mark the outcome as retrieved: with the caller gone nobody else will read it.
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    return await asyncio.shield(task)
+
+# --- Write Helpers (run on the writer thread) ---
+def _insert_many(conn: sqlite3.Connection, sql: str, rows: List[tuple]) -> None:
+    """ Inserts every row with one executemany() inside a single transaction. """
+    # IMMEDIATE takes the write lock up front instead of upgrading a deferred
+    # transaction mid-way, which is where SQLITE_BUSY surfaces under WAL.
+    conn.execute("BEGIN IMMEDIATE")
+    conn.executemany(sql, rows)
+    conn.commit()
+
+# --- SQL Statements ---
+# Every tool passes the same string object each call, so the connection's
+# statement cache (STATEMENT_CACHE_SIZE) reuses the prepared plan.
+
+INSERT_STUDENT_SQL = "INSERT INTO students (name, grade, monthly_fee) VALUES (?, ?, ?)"
+
+# RETURNING hands back the new id and the server-side joined_date default in one step.
+ADD_STUDENT_SQL = "INSERT INTO students (name, grade, monthly_fee) VALUES (?, ?, ?) RETURNING id, joined_date"
+
+# A NULL test_date is filled in by SQLite with today's local date, so tools
+# never compute the default in Python.
+INSERT_TEST_RESULT_SQL = """
+    INSERT INTO test_results (student_id, test_date, topic, marks_obtained, total_marks)
+    VALUES (?, COALESCE(?, CAST(strftime('%Y%m%d', 'now', 'localtime') AS INTEGER)), ?, ?, ?)
+"""
+
+# One LEFT JOIN round-trip: every row repeats the profile, test columns are NULL when there are none.
+STUDENT_REPORT_SQL = """
+    SELECT s.id, s.name, s.grade, s.monthly_fee, s.joined_date,
+           t.test_date, t.topic, t.marks_obtained, t.total_marks
+    FROM students s
+    LEFT JOIN test_results t ON t.student_id = s.id
+    WHERE s.id = ?
+    ORDER BY t.test_date DESC
+"""
+
+# RETURNING reports whether a row existed in the same statement, with no separate lookup.
+DELETE_STUDENT_SQL = "DELETE FROM students WHERE id = ? RETURNING name"
+
 # --- MCP Tools (Strictly Documented for Azure Foundry Schema) ---
 
+# Row types for the bulk tools: FastMCP validates every entry against these and
+# publishes their fields in the tool's input schema.
+class StudentRecord(TypedDict):
+    name: str
+    grade: str
+    monthly_fee: NotRequired[float]
+
+class ScoreEntry(TypedDict):
+    student_id: int
+    topic: str
+    marks: float
+    total: float
+    date: NotRequired[Optional[str]]
+
+# Column names for the row arrays in get_student_report's academic_history.
+HISTORY_COLUMNS = ["test_date", "topic", "marks_obtained", "total_marks"]
+
 @mcp.tool()
+@tool_errors
 async def add_student(name: str, grade: str, monthly_fee: float) -> Dict[str, Any]:
     """
     Registers a new student into the tutoring system.
@@ -233,18 +683,17 @@ async def add_student(name: str, grade: str, monthly_fee: float) -> Dict[str, An
         grade: The current grade or class level (e.g., 'Grade 10').
         monthly_fee: The agreed upon monthly tuition fee amount.
     """
-    try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            cursor = await db.execute(
-                "INSERT INTO students (name, grade, monthly_fee) VALUES (?, ?, ?)",
-                (name, grade, monthly_fee)
-            )
-            await db.commit()
-            return {"status": "success", "student_id": cursor.lastrowid}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    def insert(conn: sqlite3.Connection) -> Tuple[int, int]:
+        row = conn.execute(ADD_STUDENT_SQL, (name, grade, monthly_fee)).fetchone()
+        conn.commit()
+        return row
+
+    student_id, joined_date = await db_pool.write(insert)
+    # A new id has no cached report, so there is nothing to invalidate.
+    return {"status": "success", "student_id": student_id, "joined_date": int_to_iso(joined_date)}
 
 @mcp.tool()
+@tool_errors
 async def record_test_score(
     student_id: int, 
     topic: str, 
@@ -262,41 +711,96 @@ async def record_test_score(
         total: The maximum possible score.
         date: The date of the test (YYYY-MM-DD). Defaults to today.
     """
-    test_date = date if date else datetime.now().strftime("%Y-%m-%d")
-    try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute(
-                "INSERT INTO test_results (student_id, test_date, topic, marks_obtained, total_marks) VALUES (?, ?, ?, ?, ?)",
-                (student_id, test_date, topic, marks, total)
-            )
-            await db.commit()
-            return {"status": "success", "message": f"Recorded score for {topic}."}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    test_date = date_to_int(date) if date else None
+
+    async def commit() -> None:
+        await insert_buffer.insert(INSERT_TEST_RESULT_SQL, (student_id, test_date, topic, marks, total))
+        invalidate_students(student_id)
+
+    await run_shielded(commit())
+    return {"status": "success", "message": f"Recorded score for {topic}."}
 
 @mcp.tool()
+@tool_errors
+async def add_students_bulk(records: List[StudentRecord]) -> Dict[str, Any]:
+    """
+    Registers many students at once inside a single transaction.
+    
+    Args:
+        records: One entry per student with 'name', 'grade' and optional 'monthly_fee' keys.
+    """
+    rows = [(r["name"], r["grade"], r.get("monthly_fee", 0.0)) for r in records]
+    await db_pool.write(_insert_many, INSERT_STUDENT_SQL, rows)
+    # New rows only: no cached report can cover an id that did not exist yet.
+    return {"status": "success", "message": f"Registered {len(rows)} students."}
+
+@mcp.tool()
+@tool_errors
+async def record_test_scores_bulk(scores: List[ScoreEntry]) -> Dict[str, Any]:
+    """
+    Logs a batch of test marks (e.g. a whole exam sheet) inside a single transaction.
+    
+    Args:
+        scores: One entry per result with 'student_id', 'topic', 'marks', 'total' and optional 'date' (YYYY-MM-DD, defaults to today) keys.
+    """
+    rows = [
+        (s["student_id"], date_to_int(s["date"]) if s.get("date") else None, s["topic"], s["marks"], s["total"])
+        for s in scores
+    ]
+
+    async def commit() -> None:
+        await db_pool.write(_insert_many, INSERT_TEST_RESULT_SQL, rows)
+        invalidate_students(*{row[0] for row in rows})
+
+    await run_shielded(commit())
+    return {"status": "success", "message": f"Recorded {len(rows)} scores."}
+
+@mcp.tool()
+@tool_errors
 async def get_student_report(student_id: int) -> Dict[str, Any]:
     """
     Retrieves full profile and academic history for a student.
     
+    The academic history is column-oriented: 'columns' names the fields once and
+    each entry in 'rows' is one test as [test_date, topic, marks_obtained, total_marks],
+    newest first.
+    
     Args:
         student_id: The unique integer ID of the student to look up.
     """
-    try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            db.row_factory = aiosqlite.Row
-            async with db.execute("SELECT * FROM students WHERE id = ?", (student_id,)) as cur:
-                profile = await cur.fetchone()
-                if not profile: return {"status": "error", "message": "Student not found"}
-                
-            async with db.execute("SELECT * FROM test_results WHERE student_id = ? ORDER BY test_date DESC", (student_id,)) as cur:
-                tests = [dict(row) for row in await cur.fetchall()]
-
-            return {"profile": dict(profile), "academic_history": tests}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    cached = _report_cache.get(student_id)
+    version = _student_version.get(student_id, 0)
+    epoch = _delete_epoch
+    if cached is not None and cached[0] == version:
+        _report_cache.move_to_end(student_id)
+        return cached[1]
+
+    async with db_pool.acquire_reader() as db:
+        async with db.execute(STUDENT_REPORT_SQL, (student_id,)) as cur:
+            # Stream rows in READ_CHUNK_SIZE batches instead of materializing them all first.
+            profile: Optional[Dict[str, Any]] = None
+            tests: List[List[Any]] = []
+            async for r in cur:
+                if profile is None:
+                    profile = {
+                        "id": r[0], "name": r[1], "grade": r[2],
+                        "monthly_fee": r[3], "joined_date": int_to_iso(r[4]),
+                    }
+                if r[5] is not None:
+                    tests.append([int_to_iso(r[5]), r[6], r[7], r[8]])
+
+    if profile is None: return {"status": "error", "message": "Student not found"}
+    report = {"profile": profile, "academic_history": {"columns": HISTORY_COLUMNS, "rows": tests}}
+    # Stored under the version seen before querying: a write that committed meanwhile has bumped it past this.
+    if epoch == _delete_epoch:
+        _report_cache[student_id] = (version, report)
+        _report_cache.move_to_end(student_id)
+        if len(_report_cache) > REPORT_CACHE_MAX:
+            _report_cache.popitem(last=False)
+    return report
 
 @mcp.tool()
+@tool_errors
 async def delete_student(student_id: int) -> Dict[str, str]:
     """
     Permanently deletes a student and all their academic records.
@@ -304,13 +808,20 @@ async def delete_student(student_id: int) -> Dict[str, str]:
     Args:
         student_id: The unique integer ID of the student to delete.
     """
-    try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute("DELETE FROM students WHERE id = ?", (student_id,))
-            await db.commit()
-            return {"status": "success", "message": f"Student ID {student_id} deleted."}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
+    def delete(conn: sqlite3.Connection) -> Optional[str]:
+        row = conn.execute(DELETE_STUDENT_SQL, (student_id,)).fetchone()
+        conn.commit()
+        return row[0] if row else None
+
+    async def commit() -> Optional[str]:
+        name = await db_pool.write(delete)
+        if name is not None:
+            forget_student(student_id)
+        return name
+
+    name = await run_shielded(commit())
+    if name is None: return {"status": "error", "message": "Student not found"}
+    return {"status": "success", "message": f"Student {name} (ID {student_id}) deleted."}
 
 # --- Run Settings ---
 if __name__ == "__main__":